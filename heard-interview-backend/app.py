@@ -1,13 +1,27 @@
+import os
 import flask
 from flask_cors import CORS
 from services.transaction_service import TransactionService
 from services.account_service import AccountService
+from services.graph_service import GraphService
+from repositories.write_batcher import WriteBatcher
 app = flask.Flask(__name__)
 
 CORS(app)
 
-transaction_service = TransactionService()
-account_service = AccountService()
+# Opt-in group commit of concurrent writes -- only pays off with a threaded server (e.g. gunicorn --threads)
+write_batcher = None
+if os.environ.get('WRITE_BATCHING') == '1':
+    write_batcher = WriteBatcher(
+        max_batch_size=int(os.environ.get('WRITE_BATCH_MAX_SIZE', 64)),
+        max_wait_ms=float(os.environ.get('WRITE_BATCH_MAX_WAIT_MS', 0.0)),
+        synchronous=os.environ.get('WRITE_BATCH_SYNCHRONOUS', 'FULL'),
+        timeout=float(os.environ.get('WRITE_BATCH_TIMEOUT_S', 30.0))
+    )
+
+transaction_service = TransactionService(write_batcher=write_batcher)
+account_service = AccountService(write_batcher=write_batcher)
+graph_service = GraphService()
 
 '''
     ------------------------- HELLO WORLD / HEALTH CHECK ENDPOINT -------------------------
@@ -49,6 +63,8 @@ def create_transaction():
         return flask.jsonify(transaction), 201
     except ValueError as e:
         return flask.jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        return flask.jsonify({"error": str(e)}), 503
     
 '''
     Delete a transaction
@@ -59,9 +75,12 @@ def create_transaction():
 def delete_transaction(title):
     if flask.request.method == 'OPTIONS':
         return '', 204
-    if transaction_service.delete_transaction(title):
-        return flask.jsonify({"message": "Transaction deleted successfully"})
-    return flask.jsonify({"error": "Transaction not found"}), 404
+    try:
+        if transaction_service.delete_transaction(title):
+            return flask.jsonify({"message": "Transaction deleted successfully"})
+        return flask.jsonify({"error": "Transaction not found"}), 404
+    except TimeoutError as e:
+        return flask.jsonify({"error": str(e)}), 503
 
 '''
     Update a transaction
@@ -79,6 +98,8 @@ def update_transaction(title):
         return flask.jsonify({"error": "Transaction not found"}), 404
     except ValueError as e:
         return flask.jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        return flask.jsonify({"error": str(e)}), 503
 
 '''
     ------------------------- ACCOUNT ENDPOINTS -------------------------
@@ -107,6 +128,8 @@ def create_account():
         return flask.jsonify(account), 201
     except ValueError as e:
         return flask.jsonify({"error": str(e)}), 400
+    except TimeoutError as e:
+        return flask.jsonify({"error": str(e)}), 503
     
 '''
     Get account by name
@@ -120,6 +143,93 @@ def get_account(account_name):
     return flask.jsonify(account)
     
 
+'''
+    ------------------------- COUNTERPARTY GRAPH ENDPOINTS -------------------------
+'''
+
+'''
+    Read an integer query parameter
+    @param name: str - The name of the query parameter
+    @param default: int - The value to use when the parameter is missing
+    @return: int - The parsed value
+    @raise ValueError: If the parameter is present but not an integer
+'''
+def get_int_arg(name: str, default: int) -> int:
+    value = flask.request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name.capitalize()} must be an integer")
+
+'''
+    Get the accounts an account has transacted with directly
+    @param account_name: str - The name of the account
+    @query direction: str - 'out', 'in' or 'both' (default 'out')
+    @query limit: int - The maximum number of neighbors to return (default 10)
+'''
+@app.route('/api/accounts/<string:account_name>/neighbors', methods=['GET', 'OPTIONS'])
+def get_account_neighbors(account_name):
+    if flask.request.method == 'OPTIONS':
+        return '', 204
+    direction = flask.request.args.get('direction', 'out')
+    try:
+        limit = get_int_arg('limit', 10)
+        neighbors = graph_service.get_neighbors(account_name, direction, limit)
+        return flask.jsonify(neighbors)
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
+'''
+    Get all accounts reachable from an account within N hops
+    @param account_name: str - The name of the account
+    @query hops: int - The maximum number of hops to follow (default 2)
+    @query direction: str - 'out', 'in' or 'both' (default 'out')
+'''
+@app.route('/api/accounts/<string:account_name>/reachable', methods=['GET', 'OPTIONS'])
+def get_account_reachable(account_name):
+    if flask.request.method == 'OPTIONS':
+        return '', 204
+    direction = flask.request.args.get('direction', 'out')
+    try:
+        hops = get_int_arg('hops', 2)
+        reachable = graph_service.get_reachable(account_name, hops, direction)
+        return flask.jsonify(reachable)
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
+'''
+    Get the counterparties an account has moved the most money with
+    @param account_name: str - The name of the account
+    @query limit: int - The maximum number of counterparties to return (default 10)
+'''
+@app.route('/api/accounts/<string:account_name>/counterparties', methods=['GET', 'OPTIONS'])
+def get_account_top_counterparties(account_name):
+    if flask.request.method == 'OPTIONS':
+        return '', 204
+    try:
+        limit = get_int_arg('limit', 10)
+        counterparties = graph_service.get_top_counterparties(account_name, limit)
+        return flask.jsonify(counterparties)
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
+'''
+    Get the net flow of money between two accounts
+    @param account_name: str - The account the flow is measured from
+    @param counterparty_name: str - The other account
+'''
+@app.route('/api/accounts/<string:account_name>/flow/<string:counterparty_name>', methods=['GET', 'OPTIONS'])
+def get_account_net_flow(account_name, counterparty_name):
+    if flask.request.method == 'OPTIONS':
+        return '', 204
+    try:
+        flow = graph_service.get_net_flow(account_name, counterparty_name)
+        return flask.jsonify(flow)
+    except ValueError as e:
+        return flask.jsonify({"error": str(e)}), 400
+
 '''
     ------------------------- UTILITY ENDPOINTS -------------------------
 '''
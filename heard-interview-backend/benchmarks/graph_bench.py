@@ -0,0 +1,125 @@
+'''
+    Counterparty graph benchmark
+
+    Generates a synthetic transaction graph into a temporary database, then times the edge index
+    backfill, incremental index maintenance on writes, and the graph queries on top of it.
+    Account activity is skewed so a few hub accounts carry most of the edges, like real payment graphs.
+
+    Run from heard-interview-backend/:
+        python -m benchmarks.graph_bench --transactions 2000000
+'''
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from repositories.transaction_repository import TransactionRepository
+from services.graph_service import GraphService, MAX_HOPS
+
+'''
+    Fill the transactions table with random transfers (no edge index yet)
+    @param db_path: str - The database to fill
+    @param transactions: int - The number of transactions to generate
+    @param accounts: int - The number of accounts to spread them over
+    @param seed: int - The random seed
+'''
+def generate_transactions(db_path: str, transactions: int, accounts: int, seed: int):
+    rng = random.Random(seed)
+
+    def rows():
+        for i in range(transactions):
+            # Cubing a uniform draw piles senders onto low account numbers, which become the hubs
+            from_index = int(accounts * rng.random() ** 3)
+            to_index = rng.randrange(accounts - 1)
+            if to_index >= from_index:
+                to_index += 1
+            yield (f'tx{i}', 'synthetic', rng.randrange(1, 10000), f'acct{from_index}', f'acct{to_index}', 0)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+            CREATE TABLE transactions (
+                title TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                fromAccount TEXT NOT NULL,
+                toAccount TEXT NOT NULL,
+                transactionDate INTEGER NOT NULL
+            )
+        ''')
+        conn.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)', rows())
+        conn.commit()
+
+'''
+    Time a call a few times
+    @param fn: Callable - The call to time
+    @param repeat: int - How many times to run it
+    @return: tuple - (median milliseconds, the last result)
+'''
+def timed(fn, repeat: int = 5) -> tuple:
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--accounts', type=int, default=None, help='defaults to transactions / 20')
+    parser.add_argument('--writes', type=int, default=1000, help='incremental writes to time against the full index')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    accounts = args.accounts or max(args.transactions // 20, 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'transactions.db')
+
+        start = time.perf_counter()
+        generate_transactions(db_path, args.transactions, accounts, args.seed)
+        print(f'generated {args.transactions} transactions over {accounts} accounts in {time.perf_counter() - start:.1f}s')
+
+        start = time.perf_counter()
+        repository = TransactionRepository(db_path)
+        backfill = time.perf_counter() - start
+        with sqlite3.connect(db_path) as conn:
+            edges = conn.execute('SELECT COUNT(*) FROM transaction_edges').fetchone()[0]
+        print(f'backfilled {edges} edges in {backfill:.1f}s')
+
+        start = time.perf_counter()
+        for i in range(args.writes):
+            repository.create_transaction({
+                'title': f'write{i}', 'description': 'synthetic', 'amount': 100,
+                'fromAccount': 'acct0', 'toAccount': f'acct{i % accounts + 1}', 'transactionDate': 0
+            })
+        for i in range(args.writes):
+            repository.delete_transaction(f'write{i}')
+        writes = time.perf_counter() - start
+        print(f'{args.writes} creates + {args.writes} deletes: {writes / (2 * args.writes) * 1000:.2f} ms per write')
+
+        service = GraphService(db_path)
+        hub = 'acct0'
+        typical = f'acct{accounts - 1}'
+        print()
+        print(f'{"query":<40} {"ms":>9}  result')
+        for name, account in (('hub', hub), ('typical', typical)):
+            ms, result = timed(lambda: service.get_neighbors(account, 'both', 100))
+            print(f'{"neighbors both limit=100 (" + name + ")":<40} {ms:9.2f}  {len(result)} edges')
+            ms, result = timed(lambda: service.get_top_counterparties(account, 100))
+            print(f'{"top counterparties limit=100 (" + name + ")":<40} {ms:9.2f}  {len(result)} accounts')
+        ms, result = timed(lambda: service.get_net_flow(hub, typical))
+        print(f'{"net flow (hub, typical)":<40} {ms:9.2f}  {result["net_flow"]}')
+
+        for name, account in (('hub', hub), ('typical', typical)):
+            for direction in ('out', 'both'):
+                for hops in range(1, MAX_HOPS + 1):
+                    ms, result = timed(lambda: service.get_reachable(account, hops, direction), repeat=3)
+                    label = f'reachable {direction} hops={hops} ({name})'
+                    truncated = ' (truncated)' if result['truncated'] else ''
+                    print(f'{label:<40} {ms:9.2f}  {len(result["accounts"])} accounts{truncated}')
+
+if __name__ == '__main__':
+    main()
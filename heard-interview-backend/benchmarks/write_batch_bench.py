@@ -0,0 +1,87 @@
+'''
+    Write batching benchmark
+
+    Measures create throughput through TransactionService and AccountService with and without the
+    group-commit WriteBatcher, at increasing client concurrency. Each run uses fresh databases in a
+    temporary directory; clients are threads, like a threaded Flask/gunicorn worker.
+
+    Run from heard-interview-backend/:
+        python -m benchmarks.write_batch_bench --writes 400 --clients 1 8 32
+'''
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from repositories.write_batcher import WriteBatcher
+from services.account_service import AccountService
+from services.transaction_service import TransactionService
+
+'''
+    Run a number of creates across a pool of clients
+    @param create: Callable[[int], Any] - Creates the i-th record
+    @param writes: int - The number of records to create
+    @param clients: int - The number of concurrent clients
+    @return: float - Writes per second
+'''
+def measure(create, writes: int, clients: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(create, range(writes)))
+    return writes / (time.perf_counter() - start)
+
+'''
+    Measure one configuration in a fresh working directory (the services open their databases relative to it)
+    @param kind: str - 'transactions' or 'accounts'
+    @param write_batcher: Optional[WriteBatcher] - The batcher to use (closed before the directory is removed),
+        or None for one commit per write
+    @param writes: int - The number of records to create
+    @param clients: int - The number of concurrent clients
+    @return: float - Writes per second
+'''
+def run(kind: str, write_batcher, writes: int, clients: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            if kind == 'transactions':
+                service = TransactionService(write_batcher=write_batcher)
+                create = lambda i: service.create_transaction({
+                    'title': f'tx{i}', 'description': 'bench', 'amount': 100,
+                    'fromAccount': f'acct{i % 50}', 'toAccount': f'acct{i % 50 + 50}',
+                    'transactionDate': '2024-01-01'
+                })
+            else:
+                service = AccountService(write_batcher=write_batcher)
+                create = lambda i: service.create_account({'account_name': f'acct{i}'})
+            return measure(create, writes, clients)
+        finally:
+            # Stop the writer threads while their databases still exist
+            if write_batcher is not None:
+                write_batcher.close()
+            os.chdir(cwd)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writes', type=int, default=400, help='creates per run')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=0.0)
+    parser.add_argument('--synchronous', default='FULL', help='FULL, NORMAL or OFF')
+    args = parser.parse_args()
+
+    print(f'{"kind":<14} {"clients":>7} {"unbatched/s":>12} {"batched/s":>10} {"speedup":>8}')
+    for kind in ('transactions', 'accounts'):
+        for clients in args.clients:
+            unbatched = run(kind, None, args.writes, clients)
+            # A new batcher per run -- run() closes it, and every run's databases share the same relative path
+            write_batcher = WriteBatcher(
+                max_batch_size=args.max_batch_size,
+                max_wait_ms=args.max_wait_ms,
+                synchronous=args.synchronous
+            )
+            batched = run(kind, write_batcher, args.writes, clients)
+            print(f'{kind:<14} {clients:>7} {unbatched:>12.0f} {batched:>10.0f} {batched / unbatched:>7.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 import sqlite3
 from typing import List, Optional
 from datetime import datetime
+from repositories.write_batcher import WriteBatcher, run_write
 
 class AccountRepository:
-    def __init__(self, db_path: str = 'accounts.db'):
+    def __init__(self, db_path: str = 'accounts.db', write_batcher: Optional[WriteBatcher] = None):
         self.db_path = db_path
+        self.write_batcher = write_batcher
         self._init_db()
 
     def _init_db(self):
@@ -47,16 +49,15 @@ class AccountRepository:
         @return: dict - The created account
     '''
     def create_account(self, account: dict) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        def write(cursor: sqlite3.Cursor) -> dict:
             cursor.execute('''
                 INSERT INTO accounts (account_name)
                 VALUES (?)
             ''', (
                 account['account_name'],
             ))
-            conn.commit()
             return account
+        return run_write(self.db_path, self.write_batcher, write)
 
     '''
         Update an account
@@ -65,8 +66,7 @@ class AccountRepository:
         @return: Optional[dict] - The updated account if found, otherwise None
     '''
     def update_account(self, account_name: str, account: dict) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        def write(cursor: sqlite3.Cursor) -> Optional[dict]:
             cursor.execute('''
                 UPDATE accounts
                 SET account_name = ?
@@ -75,10 +75,10 @@ class AccountRepository:
                 account['account_name'],
                 account_name
             ))
-            conn.commit()
             if cursor.rowcount > 0:
                 return account
             return None
+        return run_write(self.db_path, self.write_batcher, write)
 
     '''
         Delete an account
@@ -86,11 +86,10 @@ class AccountRepository:
         @return: bool - True if the account was deleted, otherwise False
     '''
     def delete_account(self, account_name: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        def write(cursor: sqlite3.Cursor) -> bool:
             cursor.execute('DELETE FROM accounts WHERE account_name = ?', (account_name,))
-            conn.commit()
-            return cursor.rowcount > 0 
+            return cursor.rowcount > 0
+        return run_write(self.db_path, self.write_batcher, write)
 
     '''
         Get all transactions for a account
@@ -1,15 +1,22 @@
 import sqlite3
 from typing import List, Optional
 from datetime import datetime
+from repositories.write_batcher import WriteBatcher, run_write
+
+# Seconds a starting worker waits for another worker's edge index backfill, which can take a while on big databases
+INIT_LOCK_TIMEOUT = 300
 
 class TransactionRepository:
-    def __init__(self, db_path: str = 'transactions.db'):
+    def __init__(self, db_path: str = 'transactions.db', write_batcher: Optional[WriteBatcher] = None):
         self.db_path = db_path
+        self.write_batcher = write_batcher
         self._init_db()
 
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        # One locked transaction so workers starting together can't each see an empty index and backfill it
+        with sqlite3.connect(self.db_path, isolation_level=None, timeout=INIT_LOCK_TIMEOUT) as conn:
             cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS transactions (
                     title TEXT PRIMARY KEY,
@@ -20,12 +27,68 @@ class TransactionRepository:
                     transactionDate INTEGER NOT NULL
                 )
             ''')
-            conn.commit()
+            # Adjacency index of the counterparty graph -- one row per (fromAccount, toAccount) pair
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS transaction_edges (
+                    fromAccount TEXT NOT NULL,
+                    toAccount TEXT NOT NULL,
+                    total_amount INTEGER NOT NULL,
+                    transaction_count INTEGER NOT NULL,
+                    PRIMARY KEY (fromAccount, toAccount)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transaction_edges_to ON transaction_edges (toAccount)')
+            # Backfill the index for databases created before it existed
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM transaction_edges)')
+            if not cursor.fetchone()[0]:
+                cursor.execute('''
+                    INSERT INTO transaction_edges (fromAccount, toAccount, total_amount, transaction_count)
+                    SELECT fromAccount, toAccount, SUM(amount), COUNT(*)
+                    FROM transactions
+                    GROUP BY fromAccount, toAccount
+                ''')
+            cursor.execute('COMMIT')
+
+    '''
+        Add a transaction to the aggregated edge between two accounts
+        @param cursor: sqlite3.Cursor - The cursor of the write being performed
+        @param from_account: str - The sending account
+        @param to_account: str - The receiving account
+        @param amount: int - The amount of the transaction
+    '''
+    def _add_edge(self, cursor: sqlite3.Cursor, from_account: str, to_account: str, amount: int):
+        cursor.execute('''
+            INSERT INTO transaction_edges (fromAccount, toAccount, total_amount, transaction_count)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT (fromAccount, toAccount) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                transaction_count = transaction_count + 1
+        ''', (from_account, to_account, amount))
+
+    '''
+        Remove a transaction from the aggregated edge between two accounts
+        @param cursor: sqlite3.Cursor - The cursor of the write being performed
+        @param from_account: str - The sending account
+        @param to_account: str - The receiving account
+        @param amount: int - The amount of the transaction
+    '''
+    def _remove_edge(self, cursor: sqlite3.Cursor, from_account: str, to_account: str, amount: int):
+        cursor.execute('''
+            UPDATE transaction_edges
+            SET total_amount = total_amount - ?, transaction_count = transaction_count - 1
+            WHERE fromAccount = ? AND toAccount = ?
+        ''', (amount, from_account, to_account))
+        # Drop the edge once no transactions are left on it
+        cursor.execute('''
+            DELETE FROM transaction_edges
+            WHERE fromAccount = ? AND toAccount = ? AND transaction_count <= 0
+        ''', (from_account, to_account))
 
     def reset_transactions(self):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM transactions')
+            cursor.execute('DELETE FROM transaction_edges')
             conn.commit()
 
     '''
@@ -58,8 +121,7 @@ class TransactionRepository:
         @return: dict - The created transaction
     '''
     def create_transaction(self, transaction: dict) -> dict:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        def write(cursor: sqlite3.Cursor) -> dict:
             cursor.execute('''
                 INSERT INTO transactions (title, description, amount, fromAccount, toAccount, transactionDate)
                 VALUES (?, ?, ?, ?, ?, ?)
@@ -71,8 +133,9 @@ class TransactionRepository:
                 transaction['toAccount'],
                 transaction['transactionDate']
             ))
-            conn.commit()
+            self._add_edge(cursor, transaction['fromAccount'], transaction['toAccount'], int(transaction['amount']))
             return transaction
+        return run_write(self.db_path, self.write_batcher, write)
 
     '''
         Update a transaction
@@ -81,8 +144,11 @@ class TransactionRepository:
         @return: Optional[dict] - The updated transaction if found, otherwise None
     '''
     def update_transaction(self, title: str, transaction: dict) -> Optional[dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        def write(cursor: sqlite3.Cursor) -> Optional[dict]:
+            cursor.execute('SELECT amount, fromAccount, toAccount FROM transactions WHERE title = ?', (title,))
+            existing = cursor.fetchone()
+            if existing is None:
+                return None
             cursor.execute('''
                 UPDATE transactions
                 SET description = ?, amount = ?, fromAccount = ?, toAccount = ?, transactionDate = ?
@@ -95,10 +161,11 @@ class TransactionRepository:
                 transaction['transactionDate'],
                 title  # Don't want to update this because it's our ID
             ))
-            conn.commit()
-            if cursor.rowcount > 0:
-                return transaction
-            return None
+            # Move the old amount off its edge and the new amount onto its (possibly different) edge
+            self._remove_edge(cursor, existing[1], existing[2], existing[0])
+            self._add_edge(cursor, transaction['fromAccount'], transaction['toAccount'], int(transaction['amount']))
+            return transaction
+        return run_write(self.db_path, self.write_batcher, write)
 
     '''
         Delete a transaction
@@ -106,8 +173,100 @@ class TransactionRepository:
         @return: bool - True if the transaction was deleted, otherwise False
     '''
     def delete_transaction(self, title: str) -> bool:
+        def write(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute('SELECT amount, fromAccount, toAccount FROM transactions WHERE title = ?', (title,))
+            existing = cursor.fetchone()
+            if existing is None:
+                return False
+            cursor.execute('DELETE FROM transactions WHERE title = ?', (title,))
+            self._remove_edge(cursor, existing[1], existing[2], existing[0])
+            return True
+        return run_write(self.db_path, self.write_batcher, write)
+
+    '''
+        Get the largest aggregated edges touching a set of accounts
+        @param account_names: List[str] - The accounts to look up
+        @param direction: str - 'out' for edges sent by the accounts, 'in' for edges received by them
+        @param limit: int - The maximum number of edges to fetch
+        @return: List[dict] - The matching edges ordered by total amount, largest first, at most limit of them
+    '''
+    def get_edges(self, account_names: List[str], direction: str, limit: int) -> List[dict]:
+        column = 'fromAccount' if direction == 'out' else 'toAccount'
         with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute('DELETE FROM transactions WHERE title = ?', (title,))
-            conn.commit()
-            return cursor.rowcount > 0 
\ No newline at end of file
+            # Join against a temp table rather than a huge IN (...) so the account list can be any size
+            # and the limit applies to the largest edges across all of it. CROSS JOIN pins the temp table
+            # as the outer loop -- otherwise SQLite would rather scan the whole edge table
+            cursor.execute('CREATE TEMP TABLE lookup_accounts (account_name TEXT PRIMARY KEY)')
+            cursor.executemany('INSERT OR IGNORE INTO lookup_accounts VALUES (?)', ((name,) for name in account_names))
+            cursor.execute(f'''
+                SELECT e.* FROM lookup_accounts a
+                CROSS JOIN transaction_edges e ON e.{column} = a.account_name
+                ORDER BY e.total_amount DESC, e.fromAccount, e.toAccount
+                LIMIT ?
+            ''', (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    '''
+        Get the largest aggregated edges of a single account
+        @param account_name: str - The name of the account
+        @param direction: str - 'out' for edges it sent, 'in' for edges it received
+        @param limit: int - The maximum number of edges to return
+        @return: List[dict] - The edges ordered by total amount, largest first
+    '''
+    def get_account_edges(self, account_name: str, direction: str, limit: int) -> List[dict]:
+        column = 'fromAccount' if direction == 'out' else 'toAccount'
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM transaction_edges
+                WHERE {column} = ?
+                ORDER BY total_amount DESC, fromAccount, toAccount
+                LIMIT ?
+            ''', (account_name, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    '''
+        Get the aggregated edge from one account to another
+        @param from_account: str - The sending account
+        @param to_account: str - The receiving account
+        @return: Optional[dict] - The edge if any transactions exist between the accounts, otherwise None
+    '''
+    def get_edge(self, from_account: str, to_account: str) -> Optional[dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM transaction_edges WHERE fromAccount = ? AND toAccount = ?', (from_account, to_account))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    '''
+        Get the counterparties an account has moved the most money with, in either direction
+        @param account_name: str - The name of the account
+        @param limit: int - The maximum number of counterparties to return
+        @return: List[dict] - The counterparties ordered by total amount sent plus received
+    '''
+    def get_top_counterparties(self, account_name: str, limit: int) -> List[dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT account_name,
+                       SUM(sent) AS sent,
+                       SUM(received) AS received,
+                       SUM(sent + received) AS total_amount,
+                       SUM(transaction_count) AS transaction_count
+                FROM (
+                    SELECT toAccount AS account_name, total_amount AS sent, 0 AS received, transaction_count
+                    FROM transaction_edges WHERE fromAccount = ?
+                    UNION ALL
+                    SELECT fromAccount AS account_name, 0 AS sent, total_amount AS received, transaction_count
+                    FROM transaction_edges WHERE toAccount = ?
+                )
+                GROUP BY account_name
+                ORDER BY total_amount DESC, account_name
+                LIMIT ?
+            ''', (account_name, account_name, limit))
+            return [dict(row) for row in cursor.fetchall()]
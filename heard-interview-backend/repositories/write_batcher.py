@@ -0,0 +1,215 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SYNCHRONOUS_MODES = ('FULL', 'NORMAL', 'OFF')
+
+# Queued after the last write to tell a writer thread to commit what it has and stop
+_CLOSE = None
+
+'''
+    Group-commit write batcher
+
+    Concurrent writes to the same database are queued and run by a single writer thread,
+    which commits everything waiting in the queue in one SQLite transaction -- one fsync for the
+    whole batch instead of one per write. A lone write is committed straight away; batches form
+    on their own from the writes that queue up while the previous commit is syncing.
+    Every write runs inside its own savepoint, so a failing write is rolled back on its own
+    and only its caller sees the error. Callers block until the batch holding their write commits.
+    If the writer thread itself fails (e.g. the database can't be opened), every queued write gets
+    the error and the next write starts a fresh writer thread. close() commits anything still queued
+    and stops the writer threads.
+'''
+class WriteBatcher:
+    '''
+        @param max_batch_size: int - The most writes committed together
+        @param max_wait_ms: float - How long to linger for more writes before committing (0 -- the default -- never lingers)
+        @param synchronous: str - SQLite synchronous mode for the writer connection ('FULL', 'NORMAL' or 'OFF')
+        @param timeout: float - How many seconds a caller waits for its batch to commit before giving up
+    '''
+    def __init__(self, max_batch_size: int = 64, max_wait_ms: float = 0.0, synchronous: str = 'FULL', timeout: float = 30.0):
+        if max_batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("Batch wait must not be negative")
+        if timeout <= 0:
+            raise ValueError("Timeout must be positive")
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Synchronous mode must be one of: {', '.join(SYNCHRONOUS_MODES)}")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self._writers: Dict[str, Tuple[queue.Queue, threading.Thread]] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+    '''
+        Queue a write and wait for the batch holding it to commit
+        @param db_path: str - The database to write to
+        @param operation: Callable[[sqlite3.Cursor], Any] - Runs the write's statements on the given cursor
+        @return: Any - Whatever the operation returned
+        @raise Exception: Whatever the operation raised, or the error that stopped its batch from committing
+        @raise TimeoutError: If the batch did not commit within the timeout -- the write may still commit later
+        @raise RuntimeError: If the batcher has been closed
+    '''
+    def submit(self, db_path: str, operation: Callable[[sqlite3.Cursor], Any]) -> Any:
+        future = Future()
+        # Enqueue under the lock so a failing writer (or close) can't drop its queue between lookup and put
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write batcher is closed")
+            if db_path in self._writers:
+                writes = self._writers[db_path][0]
+            else:
+                writes = queue.Queue()
+                writer = threading.Thread(
+                    target=self._run_writer,
+                    args=(db_path, writes),
+                    name=f'write-batcher:{db_path}',
+                    daemon=True
+                )
+                self._writers[db_path] = (writes, writer)
+                writer.start()
+            writes.put((operation, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Only the builtin on Python 3.11+, so raise the builtin for callers everywhere
+            raise TimeoutError(f"Write did not commit within {self.timeout:g}s and may still be applied")
+
+    '''
+        Commit everything already queued, stop the writer threads and close their connections.
+        Later writes raise RuntimeError
+    '''
+    def close(self):
+        with self._lock:
+            self._closed = True
+            writers = list(self._writers.values())
+            self._writers.clear()
+            for writes, _ in writers:
+                writes.put(_CLOSE)
+        for _, writer in writers:
+            writer.join()
+
+    '''
+        Writer thread -- run batches until something outside a single write fails, then hand
+        that error to every pending caller and retire the queue
+        @param db_path: str - The database to write to
+        @param writes: queue.Queue - The queue of (operation, future) pairs to run
+    '''
+    def _run_writer(self, db_path: str, writes: queue.Queue):
+        batch = []
+        conn = None
+        try:
+            # Autocommit mode so we control BEGIN/COMMIT and savepoints ourselves
+            conn = sqlite3.connect(db_path, isolation_level=None)
+            conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+            closing = False
+            while not closing:
+                batch, closing = self._collect_batch(writes)
+                if batch:
+                    self._commit_batch(conn, batch)
+            conn.close()
+        except Exception as e:
+            if conn is not None:
+                conn.close()
+            # Nothing can be put on the queue once it's out of the dict, so draining it here is final
+            with self._lock:
+                if db_path in self._writers and self._writers[db_path][0] is writes:
+                    del self._writers[db_path]
+            while True:
+                try:
+                    item = writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _CLOSE:
+                    batch.append(item)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    '''
+        Wait for the next write, then gather whatever else is already queued (or arrives within the batch window)
+        @param writes: queue.Queue - The queue of (operation, future) pairs to run
+        @return: tuple - (The (operation, future) pairs to commit together, whether the batcher is closing)
+    '''
+    def _collect_batch(self, writes: queue.Queue) -> tuple:
+        item = writes.get()
+        if item is _CLOSE:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = writes.get(timeout=remaining) if remaining > 0 else writes.get_nowait()
+            except queue.Empty:
+                break
+            if item is _CLOSE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    '''
+        Run a batch of writes in one transaction
+        @param conn: sqlite3.Connection - The writer connection
+        @param batch: list - The (operation, future) pairs to run
+    '''
+    def _commit_batch(self, conn: sqlite3.Connection, batch: list):
+        results = []
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                cursor.execute('SAVEPOINT batched_write')
+                try:
+                    results.append((future, operation(cursor), None))
+                    cursor.execute('RELEASE batched_write')
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO batched_write')
+                    cursor.execute('RELEASE batched_write')
+                    results.append((future, None, e))
+            cursor.execute('COMMIT')
+        except Exception as e:
+            # Nothing in the batch was committed, so every caller gets the error
+            for _, future in batch:
+                future.set_exception(e)
+            # A failed rollback propagates and retires the writer thread
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+'''
+    Run a write and commit it -- through the write batcher when one is configured,
+    otherwise in its own transaction
+    @param db_path: str - The database to write to
+    @param write_batcher: Optional[WriteBatcher] - The batcher to commit through, or None to commit on its own
+    @param operation: Callable[[sqlite3.Cursor], Any] - Runs the write's statements on the given cursor
+    @return: Any - Whatever the operation returned
+'''
+def run_write(db_path: str, write_batcher: Optional[WriteBatcher], operation: Callable[[sqlite3.Cursor], Any]) -> Any:
+    if write_batcher is not None:
+        return write_batcher.submit(db_path, operation)
+    # Take the write lock before the operation reads anything, so a write that reads rows to decide
+    # what to change (e.g. adjusting the edge index) can't race another writer reading the same rows
+    with sqlite3.connect(db_path, isolation_level=None) as conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            result = operation(cursor)
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+        return result
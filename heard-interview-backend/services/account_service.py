@@ -1,5 +1,6 @@
 from typing import List, Optional
 from repositories.account_repository import AccountRepository
+from repositories.write_batcher import WriteBatcher
 
 '''
     Custom exceptions for account service
@@ -40,10 +41,11 @@ class AccountNotFoundError(AccountError):
 
 '''
     Account service
+    @param write_batcher: Optional[WriteBatcher] - Commit writes in groups through this batcher instead of one by one
 '''
 class AccountService:
-    def __init__(self):
-        self.repository = AccountRepository()
+    def __init__(self, write_batcher: Optional[WriteBatcher] = None):
+        self.repository = AccountRepository(write_batcher=write_batcher)
 
     def get_all_accounts(self) -> List[dict]:
         return self.repository.get_all_accounts()
@@ -0,0 +1,149 @@
+from typing import List
+from repositories.transaction_repository import TransactionRepository
+
+# Upper bounds on traversal cost so a single request can't walk the whole graph
+MAX_HOPS = 6
+MAX_REACHABLE_ACCOUNTS = 10000
+MAX_NEIGHBORS = 100
+MAX_TOP_COUNTERPARTIES = 100
+MAX_EDGES_PER_HOP = 50000
+
+DIRECTIONS = ('out', 'in', 'both')
+
+'''
+    Counterparty graph service
+
+    Transactions form a directed graph between accounts (fromAccount -> toAccount).
+    Queries here run against the aggregated edge index kept by the transaction repository,
+    so they never have to load the full transaction list.
+    @param db_path: str - The transactions database to query
+'''
+class GraphService:
+    def __init__(self, db_path: str = 'transactions.db'):
+        self.repository = TransactionRepository(db_path)
+
+    '''
+        Make sure a direction is one we know how to follow
+        @param direction: str - The direction to validate
+        @raise ValueError: If the direction is not 'out', 'in' or 'both'
+    '''
+    def _validate_direction(self, direction: str):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direction must be one of: {', '.join(DIRECTIONS)}")
+
+    '''
+        Get the largest edges touching a set of accounts in the given direction, within an edge budget
+        @param account_names: List[str] - The accounts to expand
+        @param direction: str - 'out', 'in' or 'both'
+        @param limit: int - The maximum number of edges to fetch across both directions
+        @return: tuple - (List of (account, neighbor, edge) for every edge kept, largest total amount first,
+            whether the budget ran out)
+    '''
+    def _expand(self, account_names: List[str], direction: str, limit: int) -> tuple:
+        expanded = []
+        # Ask for one extra edge so we can tell a full budget from a truncated one
+        if direction in ('out', 'both'):
+            for edge in self.repository.get_edges(account_names, 'out', limit + 1):
+                expanded.append((edge['fromAccount'], edge['toAccount'], edge))
+        if direction in ('in', 'both'):
+            for edge in self.repository.get_edges(account_names, 'in', limit + 1):
+                expanded.append((edge['toAccount'], edge['fromAccount'], edge))
+        expanded.sort(key=lambda item: item[2]['total_amount'], reverse=True)
+        return expanded[:limit], len(expanded) > limit
+
+    '''
+        Get the largest edges between an account and the accounts directly connected to it
+        @param account_name: str - The name of the account
+        @param direction: str - 'out' for accounts it sent to, 'in' for accounts it received from, 'both' for either
+        @param limit: int - The maximum number of edges to return
+        @return: List[dict] - The aggregated edges to/from the account, largest total amount first
+        @raise ValueError: If the direction or limit is invalid
+    '''
+    def get_neighbors(self, account_name: str, direction: str = 'out', limit: int = 10) -> List[dict]:
+        self._validate_direction(direction)
+        if limit < 1 or limit > MAX_NEIGHBORS:
+            raise ValueError(f"Limit must be between 1 and {MAX_NEIGHBORS}")
+        edges = []
+        if direction in ('out', 'both'):
+            edges.extend(self.repository.get_account_edges(account_name, 'out', limit))
+        if direction in ('in', 'both'):
+            edges.extend(self.repository.get_account_edges(account_name, 'in', limit))
+        edges.sort(key=lambda edge: edge['total_amount'], reverse=True)
+        return edges[:limit]
+
+    '''
+        Get every account reachable from an account within a number of hops (breadth first)
+        @param account_name: str - The name of the starting account
+        @param max_hops: int - The maximum number of hops to follow
+        @param direction: str - 'out' to follow money forward, 'in' to follow it back, 'both' for either
+        @return: dict - The reachable accounts with their hop distance, and whether the walk was cut short
+            by the account or per-hop edge caps -- when it was, the accounts kept are the ones reached
+            over the largest edges of each hop
+        @raise ValueError: If the hop count or direction is invalid
+    '''
+    def get_reachable(self, account_name: str, max_hops: int = 2, direction: str = 'out') -> dict:
+        self._validate_direction(direction)
+        if max_hops < 1 or max_hops > MAX_HOPS:
+            raise ValueError(f"Hops must be between 1 and {MAX_HOPS}")
+
+        distances = {account_name: 0}
+        frontier = [account_name]
+        truncated = False
+        hops = 0
+        while frontier and hops < max_hops and not truncated:
+            hops += 1
+            next_frontier = []
+            expanded, truncated = self._expand(frontier, direction, MAX_EDGES_PER_HOP)
+            for _, neighbor, _ in expanded:
+                if neighbor in distances:
+                    continue
+                if len(distances) > MAX_REACHABLE_ACCOUNTS:
+                    truncated = True
+                    break
+                distances[neighbor] = hops
+                next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        del distances[account_name]
+        return {
+            'account_name': account_name,
+            'max_hops': max_hops,
+            'direction': direction,
+            'truncated': truncated,
+            'accounts': [{'account_name': name, 'hops': distance} for name, distance in distances.items()],
+        }
+
+    '''
+        Get the counterparties an account has moved the most money with
+        @param account_name: str - The name of the account
+        @param limit: int - The maximum number of counterparties to return
+        @return: List[dict] - The counterparties with amounts sent, received and in total
+        @raise ValueError: If the limit is invalid
+    '''
+    def get_top_counterparties(self, account_name: str, limit: int = 10) -> List[dict]:
+        if limit < 1 or limit > MAX_TOP_COUNTERPARTIES:
+            raise ValueError(f"Limit must be between 1 and {MAX_TOP_COUNTERPARTIES}")
+        return self.repository.get_top_counterparties(account_name, limit)
+
+    '''
+        Get the net flow of money between two accounts
+        @param account_name: str - The account the flow is measured from
+        @param counterparty_name: str - The other account
+        @return: dict - Amounts sent each way and the net flow (positive means account_name sent more)
+        @raise ValueError: If both accounts are the same
+    '''
+    def get_net_flow(self, account_name: str, counterparty_name: str) -> dict:
+        if account_name == counterparty_name:
+            raise ValueError("From and to accounts cannot be the same")
+        sent = self.repository.get_edge(account_name, counterparty_name)
+        received = self.repository.get_edge(counterparty_name, account_name)
+        sent_amount = sent['total_amount'] if sent else 0
+        received_amount = received['total_amount'] if received else 0
+        return {
+            'account_name': account_name,
+            'counterparty_name': counterparty_name,
+            'sent': sent_amount,
+            'received': received_amount,
+            'net_flow': sent_amount - received_amount,
+            'transaction_count': (sent['transaction_count'] if sent else 0) + (received['transaction_count'] if received else 0),
+        }
@@ -1,5 +1,6 @@
 from typing import List, Optional
 from repositories.transaction_repository import TransactionRepository
+from repositories.write_batcher import WriteBatcher
 from services.account_service import AccountService, AccountNotFoundError
 from datetime import datetime
 
@@ -42,11 +43,12 @@ class TransactionNotFoundError(TransactionError):
 
 '''
     Transaction service
+    @param write_batcher: Optional[WriteBatcher] - Commit writes in groups through this batcher instead of one by one
 '''
 class TransactionService:
-    def __init__(self):
-        self.repository = TransactionRepository()
-        self.account_service = AccountService()
+    def __init__(self, write_batcher: Optional[WriteBatcher] = None):
+        self.repository = TransactionRepository(write_batcher=write_batcher)
+        self.account_service = AccountService(write_batcher=write_batcher)
 
     def reset_transactions(self):
         self.repository.reset_transactions()